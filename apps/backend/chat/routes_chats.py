@@ -1,13 +1,19 @@
 import logging
-import asyncio
-from datetime import datetime
 from typing import List
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException, Response, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, Query
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
 
-from services.db import get_db_handle
+from services.db import get_chats_collection, get_conversations_collection
 from .models import ChatCreate, ChatMessageResponse
-from .utils import generate_and_update_title_background
+from .utils import (
+    is_object_id,
+    parse_conversation_id,
+    raise_conversation_access_error,
+    schedule_title_generation,
+    utc_now,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -20,45 +26,47 @@ router = APIRouter()
 async def get_conversation_chats(
     conversation_id: str,
     user_id: str = Query(..., description="User ID (required)"),
+    conv_object_id: ObjectId = Depends(parse_conversation_id),
+    conversations_collection: AsyncIOMotorCollection = Depends(
+        get_conversations_collection
+    ),
+    chats_collection: AsyncIOMotorCollection = Depends(get_chats_collection),
 ):
     """Get all chats for a conversation, ordered by creation time. Only works if the conversation belongs to the specified user."""
-    db = get_db_handle()
-    chats_collection = db["chats"]
-
-    try:
-        conv_object_id = ObjectId(conversation_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid conversation ID format")
 
-    # Verify conversation exists and belongs to the user
-    conversations_collection = db["conversations"]
-    conversation = await conversations_collection.find_one({"_id": conv_object_id})
+    # Verify the conversation exists and belongs to the requesting user
+    conversation = await conversations_collection.find_one(
+        {"_id": conv_object_id}, projection={"user_id": 1}
+    )
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-
-    # Verify the conversation belongs to the requesting user
     if conversation.get("user_id") != user_id:
         raise HTTPException(
             status_code=403,
             detail="Access denied: Conversation does not belong to this user",
         )
 
-    cursor = chats_collection.find({"conversation_id": conversation_id}).sort(
-        "created_at", 1
-    )
-    chats = []
-    async for doc in cursor:
-        chats.append(
-            ChatMessageResponse(
-                id=str(doc["_id"]),
-                conversation_id=doc["conversation_id"],
-                role=doc["role"],
-                content=doc["content"],
-                created_at=doc["created_at"],
-            )
+    # Fetch only the response fields, in one batch
+    docs = (
+        await chats_collection.find(
+            {"conversation_id": conv_object_id},
+            projection={"role": 1, "content": 1, "created_at": 1},
         )
+        .sort("created_at", 1)
+        .to_list(length=None)
+    )
 
-    return chats
+    # Documents come straight from our own collection, so skip re-validation
+    return [
+        ChatMessageResponse.model_construct(
+            id=str(doc["_id"]),
+            conversation_id=conversation_id,
+            role=doc["role"],
+            content=doc["content"],
+            created_at=doc["created_at"],
+        )
+        for doc in docs
+    ]
 
 
 @router.post(
@@ -68,66 +76,62 @@ async def create_chat(
     conversation_id: str,
     chat: ChatCreate,
     user_id: str = Query(..., description="User ID (required)"),
+    conv_object_id: ObjectId = Depends(parse_conversation_id),
+    conversations_collection: AsyncIOMotorCollection = Depends(
+        get_conversations_collection
+    ),
+    chats_collection: AsyncIOMotorCollection = Depends(get_chats_collection),
 ):
     """Add a chat message to a conversation. Only works if the conversation belongs to the specified user."""
-    db = get_db_handle()
-    chats_collection = db["chats"]
-    conversations_collection = db["conversations"]
-
-    try:
-        conv_object_id = ObjectId(conversation_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid conversation ID format")
 
-    # Verify conversation exists and belongs to the user
-    conversation = await conversations_collection.find_one({"_id": conv_object_id})
+    now = utc_now()
+
+    # Verify ownership, bump updated_at and count user messages in a single round trip
+    is_user_message = chat.role == "user"
+    conversation = await conversations_collection.find_one_and_update(
+        {"_id": conv_object_id, "user_id": user_id},
+        {
+            "$currentDate": {"updated_at": True},
+            "$inc": {"user_message_count": 1 if is_user_message else 0},
+        },
+        projection={"title": 1, "user_message_count": 1},
+        return_document=ReturnDocument.AFTER,
+    )
     if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-
-    # Verify the conversation belongs to the requesting user
-    if conversation.get("user_id") != user_id:
-        raise HTTPException(
-            status_code=403,
-            detail="Access denied: Conversation does not belong to this user",
-        )
-
-    now = datetime.utcnow()
+        await raise_conversation_access_error(conversations_collection, conv_object_id)
 
-    # Check if this is the first user message and schedule title generation
-    should_generate_title = False
-    if chat.role == "user" and not conversation.get("title"):
-        # Count existing user messages BEFORE inserting
-        existing_user_chats = await chats_collection.count_documents(
-            {"conversation_id": conversation_id, "role": "user"}
-        )
-        # If this is the first user message, schedule title generation
-        if existing_user_chats == 0:
-            should_generate_title = True
+    # Schedule title generation on the conversation's first user message
+    should_generate_title = (
+        is_user_message
+        and conversation.get("user_message_count") == 1
+        and not conversation.get("title")
+    )
 
     chat_doc = {
-        "conversation_id": conversation_id,
+        "conversation_id": conv_object_id,
         "role": chat.role,
         "content": chat.content,
         "created_at": now,
     }
 
-    result = await chats_collection.insert_one(chat_doc)
+    try:
+        result = await chats_collection.insert_one(chat_doc)
+    except Exception:
+        # Undo the count so a failed insert can't consume the first-message slot
+        if is_user_message:
+            await conversations_collection.update_one(
+                {"_id": conv_object_id}, {"$inc": {"user_message_count": -1}}
+            )
+        raise
     chat_doc["_id"] = result.inserted_id
 
-    # Update conversation's updated_at timestamp immediately
-    await conversations_collection.update_one(
-        {"_id": conv_object_id}, {"$set": {"updated_at": now}}
-    )
-
     # Schedule title generation in background if needed (non-blocking)
     if should_generate_title:
-        asyncio.create_task(
-            generate_and_update_title_background(conversation_id, chat.content)
-        )
+        schedule_title_generation(conversation_id, chat.content)
 
     return ChatMessageResponse(
         id=str(chat_doc["_id"]),
-        conversation_id=chat_doc["conversation_id"],
+        conversation_id=conversation_id,
         role=chat_doc["role"],
         content=chat_doc["content"],
         created_at=chat_doc["created_at"],
@@ -139,40 +143,38 @@ async def delete_chat(
     conversation_id: str,
     chat_id: str,
     user_id: str = Query(..., description="User ID (required)"),
+    conv_object_id: ObjectId = Depends(parse_conversation_id),
+    conversations_collection: AsyncIOMotorCollection = Depends(
+        get_conversations_collection
+    ),
+    chats_collection: AsyncIOMotorCollection = Depends(get_chats_collection),
 ):
     """Delete a single chat message from a conversation. Only works if the conversation belongs to the specified user."""
-    db = get_db_handle()
-    chats_collection = db["chats"]
-    conversations_collection = db["conversations"]
-
-    try:
-        conv_object_id = ObjectId(conversation_id)
-        chat_object_id = ObjectId(chat_id)
-    except Exception:
+    if not is_object_id(chat_id):
         raise HTTPException(status_code=400, detail="Invalid ID format")
+    chat_object_id = ObjectId(chat_id)
 
-    # Ensure conversation exists and belongs to the user
-    conversation = await conversations_collection.find_one({"_id": conv_object_id})
+    # Verify ownership and bump updated_at in a single round trip
+    conversation = await conversations_collection.find_one_and_update(
+        {"_id": conv_object_id, "user_id": user_id},
+        {"$currentDate": {"updated_at": True}},
+        projection={"_id": 1},
+    )
     if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-
-    # Verify the conversation belongs to the requesting user
-    if conversation.get("user_id") != user_id:
-        raise HTTPException(
-            status_code=403,
-            detail="Access denied: Conversation does not belong to this user",
-        )
+        await raise_conversation_access_error(conversations_collection, conv_object_id)
 
-    # Ensure chat exists and belongs to the conversation
-    chat_doc = await chats_collection.find_one(
-        {"_id": chat_object_id, "conversation_id": conversation_id}
+    # Delete the chat only if it belongs to the conversation
+    deleted = await chats_collection.find_one_and_delete(
+        {"_id": chat_object_id, "conversation_id": conv_object_id},
+        projection={"role": 1},
     )
-    if not chat_doc:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Chat not found")
 
-    await chats_collection.delete_one({"_id": chat_object_id})
-    await conversations_collection.update_one(
-        {"_id": conv_object_id}, {"$set": {"updated_at": datetime.utcnow()}}
-    )
+    # Keep the user message count in step with the stored chats
+    if deleted.get("role") == "user":
+        await conversations_collection.update_one(
+            {"_id": conv_object_id}, {"$inc": {"user_message_count": -1}}
+        )
 
     return Response(status_code=204)
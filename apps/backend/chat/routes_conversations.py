@@ -1,11 +1,12 @@
 import logging
-from datetime import datetime
 from typing import List
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi import APIRouter, Depends, Query, Response
+from motor.motor_asyncio import AsyncIOMotorCollection
 
-from services.db import get_db_handle
+from services.db import get_chats_collection, get_conversations_collection
 from .models import ConversationCreate, ConversationResponse
+from .utils import parse_conversation_id, raise_conversation_access_error, utc_now
 
 logger = logging.getLogger(__name__)
 
@@ -13,37 +14,49 @@ router = APIRouter()
 
 
 @router.get("/conversations", response_model=List[ConversationResponse])
-async def list_conversations(user_id: str = Query(..., description="User ID")):
+async def list_conversations(
+    user_id: str = Query(..., description="User ID"),
+    conversations_collection: AsyncIOMotorCollection = Depends(
+        get_conversations_collection
+    ),
+):
     """List all conversations for a user, ordered by most recent first."""
-    db = get_db_handle()
-    conversations_collection = db["conversations"]
-
-    cursor = conversations_collection.find({"user_id": user_id}).sort("updated_at", -1)
-    conversations = []
-    async for doc in cursor:
-        conversations.append(
-            ConversationResponse(
-                id=str(doc["_id"]),
-                user_id=doc["user_id"],
-                title=doc.get("title"),
-                created_at=doc["created_at"],
-                updated_at=doc["updated_at"],
-            )
+    # Fetch only the response fields, in one batch
+    docs = (
+        await conversations_collection.find(
+            {"user_id": user_id},
+            projection={"user_id": 1, "title": 1, "created_at": 1, "updated_at": 1},
         )
+        .sort("updated_at", -1)
+        .to_list(length=None)
+    )
 
-    return conversations
+    # Documents come straight from our own collection, so skip re-validation
+    return [
+        ConversationResponse.model_construct(
+            id=str(doc["_id"]),
+            user_id=doc["user_id"],
+            title=doc.get("title"),
+            created_at=doc["created_at"],
+            updated_at=doc["updated_at"],
+        )
+        for doc in docs
+    ]
 
 
 @router.post("/conversations", response_model=ConversationResponse)
-async def create_conversation(conversation: ConversationCreate):
+async def create_conversation(
+    conversation: ConversationCreate,
+    conversations_collection: AsyncIOMotorCollection = Depends(
+        get_conversations_collection
+    ),
+):
     """Create a new conversation for a user."""
 
-    db = get_db_handle()
-    conversations_collection = db["conversations"]
-
-    now = datetime.utcnow()
+    now = utc_now()
     conversation_doc = {
         "user_id": conversation.user_id,
+        "user_message_count": 0,
         "created_at": now,
         "updated_at": now,
     }
@@ -64,31 +77,22 @@ async def create_conversation(conversation: ConversationCreate):
 async def delete_conversation(
     conversation_id: str,
     user_id: str = Query(..., description="User ID (required)"),
+    conv_object_id: ObjectId = Depends(parse_conversation_id),
+    conversations_collection: AsyncIOMotorCollection = Depends(
+        get_conversations_collection
+    ),
+    chats_collection: AsyncIOMotorCollection = Depends(get_chats_collection),
 ):
     """Delete an entire conversation and its chat messages. Only works if the conversation belongs to the specified user."""
 
-    db = get_db_handle()
-    conversations_collection = db["conversations"]
-    chats_collection = db["chats"]
-
-    try:
-        conv_object_id = ObjectId(conversation_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid conversation ID format")
-
-    conversation = await conversations_collection.find_one({"_id": conv_object_id})
+    # Verify ownership and delete the conversation record in a single round trip
+    conversation = await conversations_collection.find_one_and_delete(
+        {"_id": conv_object_id, "user_id": user_id}, projection={"_id": 1}
+    )
     if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-
-    # Verify the conversation belongs to the requesting user
-    if conversation.get("user_id") != user_id:
-        raise HTTPException(
-            status_code=403,
-            detail="Access denied: Conversation does not belong to this user",
-        )
+        await raise_conversation_access_error(conversations_collection, conv_object_id)
 
-    # Delete chats first, then the conversation record
-    await chats_collection.delete_many({"conversation_id": conversation_id})
-    await conversations_collection.delete_one({"_id": conv_object_id})
+    # Then remove its chats
+    await chats_collection.delete_many({"conversation_id": conv_object_id})
 
     return Response(status_code=204)
@@ -1,12 +1,11 @@
 import logging
-import json
 import asyncio
+import orjson
 from urllib.parse import unquote
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Request, Query
 from fastapi.responses import StreamingResponse
 
-from data.pump_config import get_pump_config
 from .models import ChatRequest, ChatResponse
 from .utils import get_openai_service, build_system_message
 from .tools import get_tools_schema, handle_function_call
@@ -16,9 +15,237 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-def sse_format(data: dict, event: str = "message") -> str:
+# Precomputed SSE framing for the default "message" event
+_SSE_MESSAGE_PREFIX = b"event: message\ndata: "
+_SSE_SUFFIX = b"\n\n"
+
+
+def sse_format(data: dict, event: str = "message") -> bytes:
     """Format data as Server-Sent Events."""
-    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    if event == "message":
+        return _SSE_MESSAGE_PREFIX + orjson.dumps(data) + _SSE_SUFFIX
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + _SSE_SUFFIX
+
+
+# Terminal event sent once the assistant has finished responding
+_SSE_DONE_EVENT = sse_format({"done": True})
+
+# Framing around a streamed token, so deltas skip building a dict per token
+_SSE_DELTA_PREFIX = _SSE_MESSAGE_PREFIX + b'{"delta":'
+_SSE_DELTA_SUFFIX = b"}" + _SSE_SUFFIX
+
+
+# Consecutive all-failed tool rounds after which streaming gives up
+MAX_FAILED_TOOL_ROUNDS = 3
+
+# Content deltas arriving within this window are sent as a single SSE frame
+DELTA_FLUSH_INTERVAL_SECONDS = 0.016
+
+
+def _sse_delta(text: str) -> bytes:
+    """Format a streamed text delta as an SSE message event."""
+    return _SSE_DELTA_PREFIX + orjson.dumps(text) + _SSE_DELTA_SUFFIX
+
+
+class _ToolCallAccumulator:
+    """Tool call assembled from streamed deltas."""
+
+    __slots__ = ("id", "name", "arguments")
+
+    def __init__(self):
+        self.id = ""
+        self.name = ""
+        self.arguments = []
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # for some proxies
+}
+
+
+async def _stream_chat(
+    service,
+    messages: list,
+    tools: list,
+    user_id: Optional[str],
+    fastapi_request: Request,
+):
+    """Stream a chat completion as SSE events, running any tool calls between turns."""
+    try:
+        max_iterations = 5
+        iteration = 0
+        failed_tool_rounds = 0
+        loop = asyncio.get_running_loop()
+
+        while iteration < max_iterations:
+            logger.info(f"Starting stream iteration {iteration + 1}/{max_iterations}")
+            stream_resp = await service.async_client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                tools=tools,
+                tool_choice="auto",
+                temperature=0.3,
+                max_tokens=400,
+                stream=True,
+            )
+
+            # Streamed fragments are collected in lists and joined once at the end
+            content_parts = []
+            tool_calls = []
+            # Deltas not yet sent; the first one of a stream goes out immediately
+            pending_deltas = []
+            last_flush = float("-inf")
+
+            async for chunk in stream_resp:
+                try:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+
+                    # Handle content delta
+                    piece = delta.content
+                    if piece:
+                        content_parts.append(piece)
+                        pending_deltas.append(piece)
+
+                    # Flush once the window has passed, or as soon as a chunk
+                    # without text (e.g. a tool call delta) shows the text paused
+                    if pending_deltas:
+                        now = loop.time()
+                        if (
+                            not piece
+                            or now - last_flush >= DELTA_FLUSH_INTERVAL_SECONDS
+                        ):
+                            text = "".join(pending_deltas)
+                            pending_deltas.clear()
+                            last_flush = now
+                            logger.debug(f"Yielding delta chunk: {repr(text[:100])}")
+                            yield _sse_delta(text)
+
+                    # Handle tool call deltas
+                    if delta.tool_calls:
+                        for tc_delta in delta.tool_calls:
+                            index = tc_delta.index
+                            # Ensure we have enough tool calls in the list
+                            while len(tool_calls) <= index:
+                                tool_calls.append(_ToolCallAccumulator())
+
+                            # Update tool call
+                            tool_call = tool_calls[index]
+                            if tc_delta.id:
+                                tool_call.id = tc_delta.id
+                            function = tc_delta.function
+                            if function is not None:
+                                if function.name:
+                                    tool_call.name = function.name
+                                if function.arguments:
+                                    tool_call.arguments.append(function.arguments)
+                except Exception as e:
+                    logger.warning(f"Error processing chunk: {e}", exc_info=True)
+                    continue
+
+            # Send whatever text is still buffered before any tool status or done event
+            if pending_deltas:
+                yield _sse_delta("".join(pending_deltas))
+
+            # Check if we have tool calls to execute
+            if tool_calls:
+                # Only calls that received an id can be answered with a tool message
+                completed_calls = [
+                    (tc.id, tc.name, "".join(tc.arguments))
+                    for tc in tool_calls
+                    if tc.id
+                ]
+
+                # Add assistant message with tool calls
+                messages.append(
+                    {
+                        "role": "assistant",
+                        "content": "".join(content_parts),
+                        "tool_calls": [
+                            {
+                                "id": tool_call_id,
+                                "type": "function",
+                                "function": {
+                                    "name": function_name,
+                                    "arguments": raw_arguments,
+                                },
+                            }
+                            for tool_call_id, function_name, raw_arguments in completed_calls
+                        ],
+                    }
+                )
+
+                # Prepare function calls, then execute them concurrently
+                pending_calls = []
+                for tool_call_id, function_name, raw_arguments in completed_calls:
+                    try:
+                        arguments = orjson.loads(raw_arguments)
+                    except orjson.JSONDecodeError:
+                        arguments = {}
+
+                    # Send status indicator for generate_drink tool call
+                    if function_name == "generate_drink":
+                        yield sse_format(
+                            {
+                                "status": "generating_drink",
+                                "message": "Generating Drink...",
+                            }
+                        )
+
+                    pending_calls.append((tool_call_id, function_name, arguments))
+
+                results = await asyncio.gather(
+                    *(
+                        handle_function_call(name, arguments, user_id, fastapi_request)
+                        for _, name, arguments in pending_calls
+                    )
+                )
+
+                # Add function results to messages in call order
+                messages.extend(
+                    {
+                        "role": "tool",
+                        "tool_call_id": tool_call_id,
+                        "name": function_name,
+                        "content": orjson.dumps(result).decode(),
+                    }
+                    for (tool_call_id, function_name, _), result in zip(
+                        pending_calls, results
+                    )
+                )
+
+                # Stop retrying once the tools keep failing round after round
+                if results and all(r.get("success") is False for r in results):
+                    failed_tool_rounds += 1
+                    if failed_tool_rounds >= MAX_FAILED_TOOL_ROUNDS:
+                        logger.warning(
+                            f"Tool calls failed {failed_tool_rounds} rounds in a row, giving up"
+                        )
+                        yield sse_format({"error": "tool_calls_failed"})
+                        return
+                else:
+                    failed_tool_rounds = 0
+
+                iteration += 1
+                continue
+
+            # Neither text nor tool calls came back; don't report an empty reply as done
+            if not content_parts:
+                logger.warning("OpenAI returned an empty response")
+                yield sse_format({"error": "empty_response"})
+                return
+
+            # No tool calls, we're done
+            logger.info("Streaming complete, sending done signal")
+            yield _SSE_DONE_EVENT
+            return
+
+    except Exception as e:
+        logger.exception("Streaming chat generation failed")
+        yield sse_format({"error": str(e)})
 
 
 @router.post("/respond")
@@ -48,7 +275,7 @@ async def respond(
     # Build messages with system message
     system_message = await build_system_message(effective_user_id)
     messages = [{"role": "system", "content": system_message}]
-    messages.extend([{"role": m.role, "content": m.content} for m in request.messages])
+    messages.extend(m.model_dump() for m in request.messages)
 
     tools = get_tools_schema()
 
@@ -59,7 +286,7 @@ async def respond(
             iteration = 0
 
             while iteration < max_iterations:
-                completion = service.client.chat.completions.create(
+                completion = await service.async_client.chat.completions.create(
                     model="gpt-4o",
                     messages=messages,
                     tools=tools,
@@ -91,54 +318,38 @@ async def respond(
                         }
                     )
 
-                    # Execute function calls
+                    # Prepare function calls, then execute them concurrently
+                    pending_calls = []
                     for tool_call in message.tool_calls:
                         function_name = tool_call.function.name
                         try:
-                            arguments = json.loads(tool_call.function.arguments)
-                        except json.JSONDecodeError:
+                            arguments = orjson.loads(tool_call.function.arguments)
+                        except orjson.JSONDecodeError:
                             arguments = {}
 
-                        # For generate_drink, automatically inject available_ingredients if not provided
-                        if (
-                            function_name == "generate_drink"
-                            and "available_ingredients" not in arguments
-                        ):
-                            try:
-                                tool_user_id = (
-                                    arguments.get("user_id") or effective_user_id
-                                )
-                                if tool_user_id and tool_user_id != "guest":
-                                    pump_config = await get_pump_config(tool_user_id)
-                                    if pump_config:
-                                        # Get available ingredients from pumps (max 3, snake_case)
-                                        ingredients_list = []
-                                        for pump_key in ["pump1", "pump2", "pump3"]:
-                                            pump_value = pump_config.get(pump_key)
-                                            if pump_value and len(ingredients_list) < 3:
-                                                ingredients_list.append(pump_value)
-                                        if ingredients_list:
-                                            arguments["available_ingredients"] = (
-                                                ingredients_list
-                                            )
-                            except Exception as e:
-                                logger.warning(
-                                    f"Failed to inject available_ingredients: {str(e)}"
-                                )
-
-                        result = await handle_function_call(
-                            function_name, arguments, effective_user_id, fastapi_request
+                        pending_calls.append((tool_call.id, function_name, arguments))
+
+                    results = await asyncio.gather(
+                        *(
+                            handle_function_call(
+                                name, arguments, effective_user_id, fastapi_request
+                            )
+                            for _, name, arguments in pending_calls
                         )
+                    )
 
-                        # Add function result to messages
-                        messages.append(
-                            {
-                                "role": "tool",
-                                "tool_call_id": tool_call.id,
-                                "name": function_name,
-                                "content": json.dumps(result),
-                            }
+                    # Add function results to messages in call order
+                    messages.extend(
+                        {
+                            "role": "tool",
+                            "tool_call_id": tool_call_id,
+                            "name": function_name,
+                            "content": orjson.dumps(result).decode(),
+                        }
+                        for (tool_call_id, function_name, _), result in zip(
+                            pending_calls, results
                         )
+                    )
 
                     iteration += 1
                     continue
@@ -155,181 +366,10 @@ async def respond(
             logger.exception("Chat generation failed")
             raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
-    async def event_generator():
-        try:
-            max_iterations = 5
-            iteration = 0
-
-            while iteration < max_iterations:
-                stream_resp = service.client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=messages,
-                    tools=tools,
-                    tool_choice="auto",
-                    temperature=0.3,
-                    max_tokens=400,
-                    stream=True,
-                )
-
-                accumulated_content = ""
-                tool_calls = []
-
-                for chunk in stream_resp:
-                    try:
-                        choices = getattr(chunk, "choices", None)
-                        if not choices:
-                            continue
-                        delta = getattr(choices[0], "delta", None)
-                        if delta is None:
-                            continue
-
-                        # Handle content delta
-                        piece = getattr(delta, "content", None)
-                        if piece:
-                            accumulated_content += piece
-                            logger.info(f"Yielding delta chunk: {repr(piece[:100])}")
-                            formatted = sse_format({"delta": piece})
-                            logger.debug(f"SSE formatted: {formatted[:200]}")
-                            yield formatted
-                            # Give event loop a chance to send the data immediately
-                            await asyncio.sleep(0)
-
-                        # Handle tool call deltas
-                        tool_call_delta = getattr(delta, "tool_calls", None)
-                        if tool_call_delta:
-                            for tc_delta in tool_call_delta:
-                                index = getattr(tc_delta, "index", None)
-                                if index is not None:
-                                    # Ensure we have enough tool calls in the list
-                                    while len(tool_calls) <= index:
-                                        tool_calls.append(
-                                            {
-                                                "id": "",
-                                                "type": "function",
-                                                "function": {
-                                                    "name": "",
-                                                    "arguments": "",
-                                                },
-                                            }
-                                        )
-
-                                    # Update tool call
-                                    if getattr(tc_delta, "id", None):
-                                        tool_calls[index]["id"] = tc_delta.id
-                                    if getattr(tc_delta.function, "name", None):
-                                        tool_calls[index]["function"]["name"] = (
-                                            tc_delta.function.name
-                                        )
-                                    if getattr(tc_delta.function, "arguments", None):
-                                        tool_calls[index]["function"]["arguments"] += (
-                                            tc_delta.function.arguments
-                                        )
-                    except Exception as e:
-                        logger.warning(f"Error processing chunk: {e}", exc_info=True)
-                        continue
-
-                # Check if we have tool calls to execute
-                if tool_calls:
-                    # Add assistant message with tool calls
-                    messages.append(
-                        {
-                            "role": "assistant",
-                            "content": accumulated_content or "",
-                            "tool_calls": [
-                                {
-                                    "id": tc["id"],
-                                    "type": tc["type"],
-                                    "function": {
-                                        "name": tc["function"]["name"],
-                                        "arguments": tc["function"]["arguments"],
-                                    },
-                                }
-                                for tc in tool_calls
-                                if tc["id"]
-                            ],
-                        }
-                    )
-
-                    # Execute function calls
-                    for tool_call in tool_calls:
-                        if not tool_call["id"]:
-                            continue
-
-                        function_name = tool_call["function"]["name"]
-                        try:
-                            arguments = json.loads(tool_call["function"]["arguments"])
-                        except json.JSONDecodeError:
-                            arguments = {}
-
-                        # For generate_drink, automatically inject available_ingredients if not provided
-                        if (
-                            function_name == "generate_drink"
-                            and "available_ingredients" not in arguments
-                        ):
-                            try:
-                                tool_user_id = (
-                                    arguments.get("user_id") or effective_user_id
-                                )
-                                if tool_user_id and tool_user_id != "guest":
-                                    pump_config = await get_pump_config(tool_user_id)
-                                    if pump_config:
-                                        # Get available ingredients from pumps (max 3, snake_case)
-                                        ingredients_list = []
-                                        for pump_key in ["pump1", "pump2", "pump3"]:
-                                            pump_value = pump_config.get(pump_key)
-                                            if pump_value and len(ingredients_list) < 3:
-                                                ingredients_list.append(pump_value)
-                                        if ingredients_list:
-                                            arguments["available_ingredients"] = (
-                                                ingredients_list
-                                            )
-                            except Exception as e:
-                                logger.warning(
-                                    f"Failed to inject available_ingredients: {str(e)}"
-                                )
-
-                        # Send status indicator for generate_drink tool call
-                        if function_name == "generate_drink":
-                            yield sse_format(
-                                {
-                                    "status": "generating_drink",
-                                    "message": "Generating Drink...",
-                                }
-                            )
-
-                        result = await handle_function_call(
-                            function_name, arguments, effective_user_id, fastapi_request
-                        )
-
-                        # Add function result to messages
-                        messages.append(
-                            {
-                                "role": "tool",
-                                "tool_call_id": tool_call["id"],
-                                "name": function_name,
-                                "content": json.dumps(result),
-                            }
-                        )
-
-                    iteration += 1
-                    continue
-
-                # No tool calls, we're done
-                yield sse_format({"done": True})
-                return
-
-        except Exception as e:
-            logger.exception("Streaming chat generation failed")
-            yield sse_format({"error": str(e)})
-
-    headers = {
-        "Cache-Control": "no-cache",
-        "Connection": "keep-alive",
-        "X-Accel-Buffering": "no",  # for some proxies
-    }
-
     return StreamingResponse(
-        event_generator(), media_type="text/event-stream", headers=headers
+        _stream_chat(service, messages, tools, effective_user_id, fastapi_request),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
     )
 
 
@@ -353,201 +393,26 @@ async def respond_stream(
 
     try:
         decoded = unquote(q)
-        payload = json.loads(decoded)
+        payload = orjson.loads(decoded)
         raw_messages = payload.get("messages", [])
         user_id = payload.get("user_id")
         if not isinstance(raw_messages, list):
             raise ValueError("messages must be a list")
-        messages = [{"role": m["role"], "content": m["content"]} for m in raw_messages]
+        # Drop any client-supplied system messages; ours is added below
+        messages = [
+            {"role": m["role"], "content": m["content"]}
+            for m in raw_messages
+            if m["role"] != "system"
+        ]
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid query payload: {str(e)}")
 
-    async def event_generator():
-        try:
-            # Build messages with system message (replace existing system message if present)
-            system_message = await build_system_message(user_id)
-            # Remove any existing system messages and add ours
-            filtered_messages = [m for m in messages if m.get("role") != "system"]
-            final_messages = [
-                {"role": "system", "content": system_message}
-            ] + filtered_messages
-
-            tools = get_tools_schema()
-            max_iterations = 5
-            iteration = 0
-
-            while iteration < max_iterations:
-                logger.info(
-                    f"Starting stream iteration {iteration + 1}/{max_iterations}"
-                )
-                stream_resp = service.client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=final_messages,
-                    tools=tools,
-                    tool_choice="auto",
-                    temperature=0.3,
-                    max_tokens=400,
-                    stream=True,
-                )
-
-                accumulated_content = ""
-                tool_calls = []
-                chunk_count = 0
-
-                for chunk in stream_resp:
-                    chunk_count += 1
-                    try:
-                        choices = getattr(chunk, "choices", None)
-                        if not choices:
-                            continue
-                        delta = getattr(choices[0], "delta", None)
-                        if delta is None:
-                            continue
-
-                        # Handle content delta
-                        piece = getattr(delta, "content", None)
-                        if piece:
-                            accumulated_content += piece
-                            logger.info(f"Yielding delta chunk: {repr(piece[:100])}")
-                            formatted = sse_format({"delta": piece})
-                            logger.debug(f"SSE formatted: {formatted[:200]}")
-                            yield formatted
-                            # Give event loop a chance to send the data immediately
-                            await asyncio.sleep(0)
-
-                        # Handle tool call deltas
-                        tool_call_delta = getattr(delta, "tool_calls", None)
-                        if tool_call_delta:
-                            for tc_delta in tool_call_delta:
-                                index = getattr(tc_delta, "index", None)
-                                if index is not None:
-                                    # Ensure we have enough tool calls in the list
-                                    while len(tool_calls) <= index:
-                                        tool_calls.append(
-                                            {
-                                                "id": "",
-                                                "type": "function",
-                                                "function": {
-                                                    "name": "",
-                                                    "arguments": "",
-                                                },
-                                            }
-                                        )
-
-                                    # Update tool call
-                                    if getattr(tc_delta, "id", None):
-                                        tool_calls[index]["id"] = tc_delta.id
-                                    if getattr(tc_delta.function, "name", None):
-                                        tool_calls[index]["function"]["name"] = (
-                                            tc_delta.function.name
-                                        )
-                                    if getattr(tc_delta.function, "arguments", None):
-                                        tool_calls[index]["function"]["arguments"] += (
-                                            tc_delta.function.arguments
-                                        )
-                    except Exception as e:
-                        logger.warning(f"Error processing chunk: {e}", exc_info=True)
-                        continue
-
-                # Check if we have tool calls to execute
-                if tool_calls:
-                    # Add assistant message with tool calls
-                    final_messages.append(
-                        {
-                            "role": "assistant",
-                            "content": accumulated_content or "",
-                            "tool_calls": [
-                                {
-                                    "id": tc["id"],
-                                    "type": tc["type"],
-                                    "function": {
-                                        "name": tc["function"]["name"],
-                                        "arguments": tc["function"]["arguments"],
-                                    },
-                                }
-                                for tc in tool_calls
-                                if tc["id"]
-                            ],
-                        }
-                    )
-
-                    # Execute function calls
-                    for tool_call in tool_calls:
-                        if not tool_call["id"]:
-                            continue
-
-                        function_name = tool_call["function"]["name"]
-                        try:
-                            arguments = json.loads(tool_call["function"]["arguments"])
-                        except json.JSONDecodeError:
-                            arguments = {}
-
-                        # For generate_drink, automatically inject available_ingredients if not provided
-                        if (
-                            function_name == "generate_drink"
-                            and "available_ingredients" not in arguments
-                        ):
-                            try:
-                                tool_user_id = arguments.get("user_id") or user_id
-                                if tool_user_id and tool_user_id != "guest":
-                                    pump_config = await get_pump_config(tool_user_id)
-                                    if pump_config:
-                                        # Get available ingredients from pumps (max 3, snake_case)
-                                        ingredients_list = []
-                                        for pump_key in ["pump1", "pump2", "pump3"]:
-                                            pump_value = pump_config.get(pump_key)
-                                            if pump_value and len(ingredients_list) < 3:
-                                                ingredients_list.append(pump_value)
-                                        if ingredients_list:
-                                            arguments["available_ingredients"] = (
-                                                ingredients_list
-                                            )
-                            except Exception as e:
-                                logger.warning(
-                                    f"Failed to inject available_ingredients: {str(e)}"
-                                )
-
-                        # Send status indicator for generate_drink tool call
-                        if function_name == "generate_drink":
-                            yield sse_format(
-                                {
-                                    "status": "generating_drink",
-                                    "message": "Generating Drink...",
-                                }
-                            )
-
-                        result = await handle_function_call(
-                            function_name, arguments, user_id, fastapi_request
-                        )
-
-                        # Add function result to messages
-                        final_messages.append(
-                            {
-                                "role": "tool",
-                                "tool_call_id": tool_call["id"],
-                                "name": function_name,
-                                "content": json.dumps(result),
-                            }
-                        )
-
-                    iteration += 1
-                    continue
-
-                # No tool calls, we're done
-                logger.info("Streaming complete, sending done signal")
-                yield sse_format({"done": True})
-                return
-
-        except Exception as e:
-            logger.exception("SSE chat generation failed")
-            yield sse_format({"error": str(e)})
-
-    headers = {
-        "Cache-Control": "no-cache",
-        "Connection": "keep-alive",
-        "X-Accel-Buffering": "no",
-    }
+    # Put our system message first
+    system_message = await build_system_message(user_id)
+    messages.insert(0, {"role": "system", "content": system_message})
 
     return StreamingResponse(
-        event_generator(), media_type="text/event-stream", headers=headers
+        _stream_chat(service, messages, get_tools_schema(), user_id, fastapi_request),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
     )
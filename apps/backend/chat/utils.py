@@ -1,6 +1,11 @@
+import asyncio
 import logging
-from typing import Optional
+import re
+import time
+from datetime import datetime, timezone
+from typing import NoReturn, Optional
 from bson import ObjectId
+from fastapi import HTTPException
 
 from services.openai import OpenAIService
 from services.db import get_db_handle
@@ -9,7 +14,25 @@ from data.users import get_user_by_id
 
 logger = logging.getLogger(__name__)
 
-# Global OpenAI service instance
+# Pending title generations are drained by a fixed pool of workers so a burst
+# of new conversations can't fan out into unbounded concurrent OpenAI calls
+TITLE_QUEUE_MAXSIZE = 1000
+TITLE_WORKER_COUNT = 4
+
+_title_queue: asyncio.Queue | None = None
+_title_workers: list[asyncio.Task] = []
+
+# System messages are cached per user for a short time to skip the user and
+# pump config lookups on every chat turn
+SYSTEM_MESSAGE_TTL_SECONDS = 30.0
+SYSTEM_MESSAGE_CACHE_MAXSIZE = 1024
+
+_system_message_cache: dict[Optional[str], tuple[float, str]] = {}
+
+# Cheap shape check for ObjectId strings, so malformed ids never reach bson
+is_object_id = re.compile(r"[0-9a-fA-F]{24}").fullmatch
+
+
 openai_service: OpenAIService | None = None
 
 
@@ -25,8 +48,56 @@ def get_openai_service() -> OpenAIService | None:
     return openai_service
 
 
+def utc_now() -> datetime:
+    """Current UTC time as a naive datetime at millisecond precision.
+
+    This is exactly what Mongo stores and Motor reads back, so a document
+    returned right after a write serializes the same way as when it is listed.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+async def parse_conversation_id(conversation_id: str) -> ObjectId:
+    """FastAPI dependency parsing the conversation_id path parameter."""
+    if not is_object_id(conversation_id):
+        raise HTTPException(status_code=400, detail="Invalid conversation ID format")
+    return ObjectId(conversation_id)
+
+
+async def raise_conversation_access_error(
+    conversations_collection, conv_object_id: ObjectId
+) -> NoReturn:
+    """Raise 404 or 403 after a user-scoped conversation lookup found nothing."""
+    exists = await conversations_collection.find_one(
+        {"_id": conv_object_id}, projection={"_id": 1}
+    )
+    if not exists:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    raise HTTPException(
+        status_code=403,
+        detail="Access denied: Conversation does not belong to this user",
+    )
+
+
+def invalidate_system_message(user_id: Optional[str]):
+    """Drop a user's cached system message, e.g. after their pump config changes.
+
+    Only this process's cache is cleared; other workers pick up the change once
+    their entry expires after SYSTEM_MESSAGE_TTL_SECONDS.
+    """
+    _system_message_cache.pop(user_id, None)
+
+
 async def build_system_message(user_id: Optional[str] = None) -> str:
     """Build system message with pump configuration and user name if available."""
+    cached = _system_message_cache.get(user_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    # Set when a lookup fails, so the degraded message isn't cached
+    lookup_failed = False
+
     base_message = "You are a helpful bartender assistant. You can help customers with drink orders and provide friendly service. Or if they're just in the mood to talk, talk to them and be friendly and inviting, fulfilling their every desire."
 
     if user_id:
@@ -40,6 +111,7 @@ async def build_system_message(user_id: Optional[str] = None) -> str:
                 if first_name:
                     base_message += f"The customer's first name is {first_name}. Use their first name when addressing them to provide a personalized experience. "
         except Exception as e:
+            lookup_failed = True
             logger.warning(f"Failed to load user data for system message: {str(e)}")
 
         # Get pump configuration
@@ -60,12 +132,20 @@ async def build_system_message(user_id: Optional[str] = None) -> str:
                     base_message += "When a user asks you to generate or create a drink, you MUST automatically use the generate_drink function with the available_ingredients parameter set to these ingredients. Do NOT ask the user what ingredients they have - you already know from their pump configuration. "
                     base_message += "When using the generate_drink function, you MUST include the available_ingredients parameter with these ingredients. "
         except Exception as e:
+            lookup_failed = True
             logger.warning(f"Failed to load pump config for system message: {str(e)}")
 
     base_message += "If a user wants to create a custom drink, use the generate_drink function to create it with an AI-generated image. "
     base_message += "After successfully generating a drink using the generate_drink function, you MUST display the drink details to the user. Include: the drink name, list of ingredients, and step-by-step instructions. Format it clearly and concisely. "
     base_message += "Keep your responses concise and helpful."
 
+    if not lookup_failed:
+        if len(_system_message_cache) >= SYSTEM_MESSAGE_CACHE_MAXSIZE:
+            _system_message_cache.clear()
+        _system_message_cache[user_id] = (
+            time.monotonic() + SYSTEM_MESSAGE_TTL_SECONDS,
+            base_message,
+        )
     return base_message
 
 
@@ -78,7 +158,7 @@ async def generate_conversation_title(first_message: str) -> str:
         return " ".join(words) + ("..." if len(first_message.split()) > 5 else "")
 
     try:
-        completion = service.client.chat.completions.create(
+        completion = await service.async_client.chat.completions.create(
             model="gpt-4o",
             messages=[
                 {
@@ -128,3 +208,48 @@ async def generate_and_update_title_background(
             logger.error(f"Failed to update conversation title: {str(e)}")
     except Exception as e:
         logger.error(f"Background title generation failed: {str(e)}")
+
+
+async def _title_worker(queue: asyncio.Queue):
+    """Generate titles for queued conversations, one at a time."""
+    while True:
+        conversation_id, first_message = await queue.get()
+        try:
+            await generate_and_update_title_background(conversation_id, first_message)
+        finally:
+            queue.task_done()
+
+
+def start_title_workers():
+    """Create the title queue and launch its workers. Call once on startup."""
+    global _title_queue
+    _title_queue = asyncio.Queue(maxsize=TITLE_QUEUE_MAXSIZE)
+    _title_workers[:] = [
+        asyncio.create_task(_title_worker(_title_queue))
+        for _ in range(TITLE_WORKER_COUNT)
+    ]
+
+
+async def stop_title_workers():
+    """Cancel the title workers, dropping any titles still queued."""
+    global _title_queue
+    for task in _title_workers:
+        task.cancel()
+    await asyncio.gather(*_title_workers, return_exceptions=True)
+    _title_workers.clear()
+    _title_queue = None
+
+
+def schedule_title_generation(conversation_id: str, first_message: str):
+    """Queue title generation for a conversation without waiting on it."""
+    if _title_queue is None:
+        logger.warning(
+            f"Title workers not running; skipping title for conversation {conversation_id}"
+        )
+        return
+    try:
+        _title_queue.put_nowait((conversation_id, first_message))
+    except asyncio.QueueFull:
+        logger.warning(
+            f"Title queue full; skipping title for conversation {conversation_id}"
+        )
@@ -17,6 +17,7 @@ from data.pump_config import (
     create_or_update_pump_config,
     normalize_to_snake_case,
 )
+from chat.utils import invalidate_system_message
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +43,12 @@ def get_firmware_client() -> FirmwareClient | None:
     return _firmware_client
 
 
+async def close_firmware_client() -> None:
+    """Close the firmware client's connection pool on shutdown."""
+    if _firmware_client is not None:
+        await _firmware_client.aclose()
+
+
 @router.get("/pump-config", response_model=PumpConfigResponse)
 async def get_pump_config_endpoint(
     user_id: str = Query(..., description="User ID to fetch pump config for"),
@@ -98,6 +105,8 @@ async def create_or_update_pump_config_endpoint(
             pump2=request.pump2,
             pump3=request.pump3,
         )
+        # The chat system message lists pump ingredients; rebuild it next turn
+        invalidate_system_message(request.user_id)
         return PumpConfigResponse(
             user_id=config.get("user_id", request.user_id),
             pump1=config.get("pump1"),
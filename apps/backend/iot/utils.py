@@ -1,4 +1,3 @@
-import json
 import logging
 import os
 import random
@@ -8,6 +7,7 @@ from pathlib import Path
 from typing import Any, Dict, Optional
 
 import httpx
+import orjson
 
 from settings import settings
 
@@ -195,13 +195,12 @@ def _resolve_config_path() -> Path:
 def get_hardware_profile() -> HardwareProfile:
     config_path = _resolve_config_path()
     try:
-        with config_path.open("r", encoding="utf-8") as fh:
-            data = json.load(fh)
+        data = orjson.loads(config_path.read_bytes())
     except FileNotFoundError as exc:
         raise RuntimeError(
             f"Pi mapping configuration not found at {config_path}."
         ) from exc
-    except json.JSONDecodeError as exc:
+    except orjson.JSONDecodeError as exc:
         raise RuntimeError(
             f"Invalid JSON in pi mapping configuration at {config_path}: {exc}"
         ) from exc
@@ -280,6 +279,11 @@ class FirmwareClient:
         self.token = token or settings.FIRMWARE_API_TOKEN
         if not self.base_url:
             raise ValueError("FIRMWARE_API_URL must be set in environment variables")
+        # URL and auth headers are fixed for the client's lifetime; build them once
+        self._drink_url = f"{self.base_url.rstrip('/')}/iot/drink"
+        self._headers = self._auth_headers()
+        # Created on first use so it binds to the running event loop
+        self._client: Optional[httpx.AsyncClient] = None
 
     def _auth_headers(self) -> dict[str, str]:
         """Build headers for firmware auth (supports token or Bearer)."""
@@ -290,6 +294,23 @@ class FirmwareClient:
             "Authorization": f"Bearer {self.token}",
         }
 
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled HTTP client, creating it on first use."""
+        if self._client is None:
+            # Use a longer timeout to allow firmware to process the request
+            self._client = httpx.AsyncClient(
+                timeout=30.0,
+                headers=self._headers,
+                limits=httpx.Limits(max_keepalive_connections=1),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client, if one was opened."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     async def send_drink_request(self, payload: dict) -> dict:
         """
         Send a drink request to the firmware API.
@@ -300,15 +321,10 @@ class FirmwareClient:
         Returns:
             Response from firmware API
         """
-        url = f"{self.base_url.rstrip('/')}/iot/drink"
-        headers = self._auth_headers()
-
         try:
-            # Use a longer timeout to allow firmware to process the request
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                return response.json()
+            response = await self._get_client().post(self._drink_url, json=payload)
+            response.raise_for_status()
+            return response.json()
         except httpx.HTTPError as e:
             logger.error(f"Failed to send drink request to firmware: {e}")
             raise
@@ -4,18 +4,26 @@ from fastapi.middleware.cors import CORSMiddleware
 from id_scanning.routes import router as id_scanning_router
 from chat.routes import router as chat_router
 from drinks.routes import router as drinks_router
-from iot.routes import router as iot_router
+from iot.routes import router as iot_router, close_firmware_client
 from realtime.routes import router as realtime_router
 from settings import settings
-from services.db import connect_to_mongo, close_mongo_connection
+from services.db import connect_to_mongo, close_mongo_connection, get_db_handle
+from chat.utils import start_title_workers, stop_title_workers
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_to_mongo()
+    # Look up the chat collections once; routes receive them as dependencies
+    db = get_db_handle()
+    app.state.chats = db["chats"]
+    app.state.conversations = db["conversations"]
+    start_title_workers()
     try:
         yield
     finally:
+        await stop_title_workers()
+        await close_firmware_client()
         await close_mongo_connection()
 
 
@@ -1,9 +1,15 @@
 from typing import AsyncGenerator, Optional
 import logging
 
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from fastapi import Request
+from motor.motor_asyncio import (
+    AsyncIOMotorClient,
+    AsyncIOMotorCollection,
+    AsyncIOMotorDatabase,
+)
 
 from settings import settings
+from services.migrations import run_migrations
 
 
 _client: Optional[AsyncIOMotorClient] = None
@@ -106,9 +112,16 @@ async def connect_to_mongo() -> None:
     global _client, _db
     if not settings.MONGODB_URI:
         raise RuntimeError("MONGODB_URI is not set")
-    _client = AsyncIOMotorClient(settings.MONGODB_URI, serverSelectionTimeoutMS=5000)
+    # Keep a few connections warm so the first requests after startup skip the handshake
+    _client = AsyncIOMotorClient(
+        settings.MONGODB_URI,
+        serverSelectionTimeoutMS=5000,
+        maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+    )
     _db = _client[settings.MONGODB_DB]
     await ensure_indexes(_db)
+    await run_migrations(_db)
 
 
 async def close_mongo_connection() -> None:
@@ -129,3 +142,13 @@ def get_db_handle() -> AsyncIOMotorDatabase:
 async def get_db() -> AsyncGenerator[AsyncIOMotorDatabase, None]:
     """FastAPI dependency that yields a database handle."""
     yield get_db_handle()
+
+
+async def get_chats_collection(request: Request) -> AsyncIOMotorCollection:
+    """FastAPI dependency returning the chats collection cached on app state."""
+    return request.app.state.chats
+
+
+async def get_conversations_collection(request: Request) -> AsyncIOMotorCollection:
+    """FastAPI dependency returning the conversations collection cached on app state."""
+    return request.app.state.conversations
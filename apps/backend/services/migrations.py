@@ -0,0 +1,120 @@
+"""One-off data migrations, applied once per database at startup.
+
+Each migration is recorded by name in the ``migrations`` collection. The worker
+that inserts the record runs it and the ones after it; later boots skip the
+completed ones, and concurrent workers leave the rest to the worker already
+running. A failed migration removes its record so the next boot retries it.
+
+Requires MongoDB 4.2+ (pipeline updates, ``$toObjectId`` and ``$merge``).
+"""
+
+from datetime import datetime, timezone
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+async def convert_chat_conversation_ids(db: AsyncIOMotorDatabase) -> None:
+    """Store chats.conversation_id as ObjectId instead of its hex string."""
+    chats = db["chats"]
+
+    # Only well-formed ids are converted so one bad row can't fail the whole update
+    result = await chats.update_many(
+        {"conversation_id": {"$type": "string", "$regex": "^[0-9a-fA-F]{24}$"}},
+        [{"$set": {"conversation_id": {"$toObjectId": "$conversation_id"}}}],
+    )
+    logger.info(
+        "Converted conversation_id to ObjectId on %d chats", result.modified_count
+    )
+
+    unmigrated = await chats.count_documents({"conversation_id": {"$type": "string"}})
+    if unmigrated:
+        logger.warning(
+            "%d chats still have a malformed string conversation_id", unmigrated
+        )
+
+
+async def backfill_user_message_count(db: AsyncIOMotorDatabase) -> None:
+    """Count stored user chats for conversations created before the counter existed."""
+    await (
+        db["conversations"]
+        .aggregate(
+            [
+                {"$match": {"user_message_count": {"$exists": False}}},
+                {
+                    "$lookup": {
+                        "from": "chats",
+                        "let": {"conversation_id": "$_id"},
+                        "pipeline": [
+                            {
+                                "$match": {
+                                    "$expr": {
+                                        "$eq": ["$conversation_id", "$$conversation_id"]
+                                    },
+                                    "role": "user",
+                                }
+                            },
+                            {"$count": "n"},
+                        ],
+                        "as": "user_chats",
+                    }
+                },
+                {
+                    "$project": {
+                        "user_message_count": {
+                            "$ifNull": [{"$arrayElemAt": ["$user_chats.n", 0]}, 0]
+                        }
+                    }
+                },
+                {
+                    "$merge": {
+                        "into": "conversations",
+                        "on": "_id",
+                        "whenMatched": "merge",
+                        "whenNotMatched": "discard",
+                    }
+                },
+            ]
+        )
+        .to_list(length=None)
+    )
+    logger.info("Backfilled conversations.user_message_count")
+
+
+# Applied in order; the backfill matches chats by ObjectId, so it runs after the conversion
+MIGRATIONS = [
+    ("chats_conversation_id_objectid", convert_chat_conversation_ids),
+    ("conversations_user_message_count", backfill_user_message_count),
+]
+
+
+async def run_migrations(db: AsyncIOMotorDatabase) -> None:
+    """Apply any migrations not yet recorded in the migrations collection."""
+    applied = db["migrations"]
+    for name, migration in MIGRATIONS:
+        try:
+            await applied.insert_one(
+                {"_id": name, "started_at": datetime.now(timezone.utc)}
+            )
+        except DuplicateKeyError:
+            record = await applied.find_one({"_id": name})
+            if record and record.get("completed_at"):
+                continue
+            # Another worker is applying it and will run the rest in order
+            return
+
+        try:
+            await migration(db)
+        except Exception as e:
+            logger.warning("Migration %s failed, will retry on next start: %s", name, e)
+            await applied.delete_one({"_id": name})
+            # Later migrations may depend on this one, so stop here
+            return
+
+        await applied.update_one(
+            {"_id": name}, {"$set": {"completed_at": datetime.now(timezone.utc)}}
+        )
+        logger.info("Applied migration %s", name)
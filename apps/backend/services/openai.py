@@ -2,7 +2,7 @@ import base64
 import json
 import asyncio
 from typing import Dict, Any, Optional
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from settings import settings
 
 
@@ -10,6 +10,7 @@ class OpenAIService:
     # Use Singleton pattern cause it's goated
     _instance: Optional["OpenAIService"] = None
     _client: Optional[OpenAI] = None
+    _async_client: Optional[AsyncOpenAI] = None
 
     def __new__(cls) -> "OpenAIService":
         if cls._instance is None:
@@ -21,11 +22,16 @@ class OpenAIService:
             if not settings.OPENAI_API_KEY:
                 raise ValueError("OpenAI API key not configured in settings")
             self._client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            self._async_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
 
     @property
     def client(self) -> OpenAI:
         return self._client
 
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        return self._async_client
+
     async def analyze_id_image(self, image_data: bytes) -> Dict[str, Any]:
         """
         Analyze an ID image using GPT-4o and extract structured information.
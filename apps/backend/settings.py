@@ -27,6 +27,9 @@ class Settings:
     # Optional: DB_USERNAME, DB_PASSWORD are ignored if DB_URI already contains them
     MONGODB_URI: Optional[str] = os.getenv("DB_URI")
     MONGODB_DB: Optional[str] = os.getenv("DB_NAME")
+    # Connection pool bounds; tune against load tests for the deployment
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv("DB_MAX_POOL_SIZE", "100"))
+    MONGODB_MIN_POOL_SIZE: int = int(os.getenv("DB_MIN_POOL_SIZE", "10"))
 
     # ID Scanning Configuration
     MAX_IMAGE_SIZE_MB: int = int(os.getenv("MAX_IMAGE_SIZE_MB", "10"))
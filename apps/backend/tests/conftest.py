@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+# Add parent directory to path to import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from chat import routes_chats
+from chat.routes import router as chat_router
+
+
+@pytest.fixture
+def chat_db():
+    """In-memory Mongo database standing in for the real one."""
+    return AsyncMongoMockClient()["bartender_boys_test"]
+
+
+@pytest.fixture
+def scheduled_titles(monkeypatch):
+    """Record title generations instead of queueing them for the workers."""
+    calls = []
+    monkeypatch.setattr(
+        routes_chats,
+        "schedule_title_generation",
+        lambda conversation_id, first_message: calls.append(
+            (conversation_id, first_message)
+        ),
+    )
+    return calls
+
+
+@pytest.fixture
+def chat_client(chat_db):
+    """Client for the chat routes, backed by the in-memory collections."""
+    app = FastAPI()
+    app.include_router(chat_router)
+    app.state.chats = chat_db["chats"]
+    app.state.conversations = chat_db["conversations"]
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,11 @@
+def test_created_timestamps_serialize_the_same_when_listed(chat_client):
+    created = chat_client.post("/chat/conversations", json={"user_id": "u1"}).json()
+    conversation_id = created["id"]
+    url = f"/chat/conversations/{conversation_id}/chats?user_id=u1"
+    chat = chat_client.post(url, json={"role": "user", "content": "hi"}).json()
+
+    listed = chat_client.get("/chat/conversations?user_id=u1").json()
+    chats = chat_client.get(url).json()
+
+    assert listed[0]["created_at"] == created["created_at"]
+    assert chats[0]["created_at"] == chat["created_at"]
@@ -0,0 +1,19 @@
+def test_create_chat_schedules_title_on_first_user_message_only(
+    chat_client, scheduled_titles
+):
+    conversation_id = chat_client.post(
+        "/chat/conversations", json={"user_id": "u1"}
+    ).json()["id"]
+    url = f"/chat/conversations/{conversation_id}/chats?user_id=u1"
+
+    assistant = chat_client.post(url, json={"role": "assistant", "content": "Hi!"})
+    assert assistant.status_code == 200
+    assert scheduled_titles == []
+
+    first = chat_client.post(url, json={"role": "user", "content": "A mojito please"})
+    assert first.status_code == 200
+    assert scheduled_titles == [(conversation_id, "A mojito please")]
+
+    second = chat_client.post(url, json={"role": "user", "content": "Make it two"})
+    assert second.status_code == 200
+    assert scheduled_titles == [(conversation_id, "A mojito please")]
@@ -0,0 +1,37 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+from bson import ObjectId
+
+
+def test_get_conversation_chats_returns_messages_oldest_first(chat_client, chat_db):
+    conversation_id = chat_client.post(
+        "/chat/conversations", json={"user_id": "u1"}
+    ).json()["id"]
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    asyncio.run(
+        chat_db["chats"].insert_many(
+            [
+                {
+                    "conversation_id": ObjectId(conversation_id),
+                    "role": role,
+                    "content": content,
+                    "created_at": start + timedelta(minutes=minute),
+                }
+                for minute, role, content in [
+                    (2, "user", "third"),
+                    (0, "user", "first"),
+                    (1, "assistant", "second"),
+                ]
+            ]
+        )
+    )
+
+    response = chat_client.get(
+        f"/chat/conversations/{conversation_id}/chats?user_id=u1"
+    )
+
+    assert response.status_code == 200
+    chats = response.json()
+    assert [chat["content"] for chat in chats] == ["first", "second", "third"]
+    assert all(chat["conversation_id"] == conversation_id for chat in chats)
@@ -0,0 +1,17 @@
+from bson import ObjectId
+
+
+def test_get_conversation_chats_rejects_other_users_and_unknown_ids(chat_client):
+    conversation_id = chat_client.post(
+        "/chat/conversations", json={"user_id": "u1"}
+    ).json()["id"]
+
+    other_user = chat_client.get(
+        f"/chat/conversations/{conversation_id}/chats?user_id=u2"
+    )
+    missing = chat_client.get(f"/chat/conversations/{ObjectId()}/chats?user_id=u1")
+    malformed = chat_client.get("/chat/conversations/not-an-id/chats?user_id=u1")
+
+    assert other_user.status_code == 403
+    assert missing.status_code == 404
+    assert malformed.status_code == 400
@@ -0,0 +1,33 @@
+import asyncio
+
+from services import migrations
+
+
+def test_run_migrations_applies_each_once_and_retries_failures(chat_db, monkeypatch):
+    runs = []
+    fail = {"second": True}
+
+    async def first(db):
+        runs.append("first")
+
+    async def second(db):
+        runs.append("second")
+        if fail["second"]:
+            raise RuntimeError("server too old")
+
+    async def third(db):
+        runs.append("third")
+
+    monkeypatch.setattr(
+        migrations,
+        "MIGRATIONS",
+        [("first", first), ("second", second), ("third", third)],
+    )
+
+    asyncio.run(migrations.run_migrations(chat_db))
+    assert runs == ["first", "second"]
+
+    fail["second"] = False
+    asyncio.run(migrations.run_migrations(chat_db))
+    asyncio.run(migrations.run_migrations(chat_db))
+    assert runs == ["first", "second", "second", "third"]
@@ -0,0 +1,12 @@
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from chat.routes_respond import sse_format
+
+
+def test_sse_format_returns_utf8_event_bytes():
+    formatted = sse_format({"delta": "café"})
+    assert formatted == 'event: message\ndata: {"delta":"café"}\n\n'.encode()
@@ -0,0 +1,104 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add parent directory to path to import modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from chat import routes_respond
+from chat.routes_respond import MAX_FAILED_TOOL_ROUNDS, _stream_chat, sse_format
+
+
+class _FakeStream:
+    """Async iterator over canned completion chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def _fake_service(create):
+    """OpenAI service stub whose streaming completions come from ``create``."""
+    completions = SimpleNamespace(create=create)
+    return SimpleNamespace(
+        async_client=SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    )
+
+
+async def _collect(service, messages):
+    return [event async for event in _stream_chat(service, messages, [], None, None)]
+
+
+def _content_chunk(text):
+    delta = SimpleNamespace(content=text, tool_calls=None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def _tool_call_chunk(call_id):
+    function = SimpleNamespace(name="generate_drink", arguments='{"name": "X"}')
+    tool_call = SimpleNamespace(index=0, id=call_id, function=function)
+    delta = SimpleNamespace(content=None, tool_calls=[tool_call])
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def test_stream_chat_gives_up_after_repeated_failed_tool_rounds(monkeypatch):
+    requests = []
+
+    async def create(**kwargs):
+        requests.append(kwargs)
+        return _FakeStream([_tool_call_chunk(f"call_{len(requests)}")])
+
+    async def failing_tool(name, arguments, user_id, fastapi_request):
+        return {"success": False, "error": "firmware unavailable"}
+
+    monkeypatch.setattr(routes_respond, "handle_function_call", failing_tool)
+    messages = [{"role": "user", "content": "make me a drink"}]
+
+    events = asyncio.run(_collect(_fake_service(create), messages))
+
+    assert len(requests) == MAX_FAILED_TOOL_ROUNDS
+    assert events[-1] == sse_format({"error": "tool_calls_failed"})
+    assert sse_format({"done": True}) not in events
+    tool_messages = [m for m in messages if m["role"] == "tool"]
+    assert len(tool_messages) == MAX_FAILED_TOOL_ROUNDS
+
+
+def test_stream_chat_reports_empty_response_instead_of_done():
+    async def create(**kwargs):
+        empty = SimpleNamespace(content=None, tool_calls=None)
+        return _FakeStream([SimpleNamespace(choices=[SimpleNamespace(delta=empty)])])
+
+    messages = [{"role": "user", "content": "hi"}]
+
+    events = asyncio.run(_collect(_fake_service(create), messages))
+
+    assert events == [sse_format({"error": "empty_response"})]
+
+
+def test_stream_chat_merges_close_deltas_into_one_frame(monkeypatch):
+    # A window long enough that only the first delta and pauses force a flush
+    monkeypatch.setattr(routes_respond, "DELTA_FLUSH_INTERVAL_SECONDS", 60.0)
+    pieces = ["Hel", "lo", " wor", "ld", None, "!"]
+
+    async def create(**kwargs):
+        return _FakeStream([_content_chunk(piece) for piece in pieces])
+
+    messages = [{"role": "user", "content": "hi"}]
+
+    events = asyncio.run(_collect(_fake_service(create), messages))
+
+    assert events == [
+        sse_format({"delta": "Hel"}),
+        sse_format({"delta": "lo world"}),
+        sse_format({"delta": "!"}),
+        sse_format({"done": True}),
+    ]
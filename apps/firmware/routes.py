@@ -19,6 +19,16 @@ logger = logging.getLogger(__name__)
 # GPIO pin mapping: pump 1 = 4, pump 2 = 17, pump 3 = 27
 GPIO_PIN_MAP = {1: 4, 2: 17, 3: 27}
 
+# Base duration: 100% = 30 seconds. Pump 2 runs twice as long as pumps 1 and 3.
+BASE_DURATION_SECONDS = 30.0
+PUMP_DURATION_MULTIPLIER = {1: 1.0, 2: 2.0, 3: 1.0}
+
+# Run time in seconds per ratio percentage point, precomputed for each pump
+SECONDS_PER_PERCENT = {
+    pump_id: BASE_DURATION_SECONDS / 100.0 * multiplier
+    for pump_id, multiplier in PUMP_DURATION_MULTIPLIER.items()
+}
+
 # Try to load pump mapping from config file if it exists
 # The config maps ingredient names to GPIO pins, but we need pump1/pump2/pump3 -> GPIO
 # We'll use the pump_mapping from the backend to map ingredients to pumps, then look up GPIO
@@ -112,15 +122,11 @@ async def receive_drink_request(
     logger.info(f"Received pour request with {len(request.steps)} steps")
     await flicker_onboard_led(times=3, duration=0.1)
     
-    # Base duration: 100% = 30 seconds
-    BASE_DURATION_SECONDS = 30.0
-    
     if not GPIO_AVAILABLE:
         logger.warning("GPIO not available - simulating pour action")
         step_summaries = []
         for s in request.steps:
-            base_dur = (s.ratio / 100.0) * BASE_DURATION_SECONDS
-            actual_dur = base_dur * 2.0 if s.pump_id == 2 else base_dur
+            actual_dur = s.ratio * SECONDS_PER_PERCENT[s.pump_id]
             step_summaries.append(f"pump {s.pump_id} ({s.ratio}%, {actual_dur:.1f}s)")
         step_summary = ", ".join(step_summaries)
         return DrinkResponse(
@@ -136,18 +142,12 @@ async def receive_drink_request(
         pump_tasks = []
         
         for step in request.steps:
-            if step.pump_id not in GPIO_PIN_MAP:
+            gpio_pin = GPIO_PIN_MAP.get(step.pump_id)
+            if gpio_pin is None:
                 logger.warning(f"Invalid pump_id: {step.pump_id}. Must be 1, 2, or 3. Skipping.")
                 continue
             
-            gpio_pin = GPIO_PIN_MAP[step.pump_id]
-            # Calculate base duration: 100% = 30 seconds
-            base_duration = (step.ratio / 100.0) * BASE_DURATION_SECONDS
-            # Pump 2 runs twice as long as pumps 1 and 3
-            if step.pump_id == 2:
-                duration = base_duration * 2.0
-            else:
-                duration = base_duration
+            duration = step.ratio * SECONDS_PER_PERCENT[step.pump_id]
             
             if duration > 0:
                 pins_to_control.add(gpio_pin)
@@ -155,27 +155,31 @@ async def receive_drink_request(
                 # Create task for this pump (capture variables to avoid closure issues)
                 async def run_pump(pin: int, pump_id: int, ratio: int, dur: float):
                     """Run a single pump for the specified duration."""
-                    GPIO.setup(pin, GPIO.OUT)
-                    GPIO.output(pin, GPIO.LOW)  # Start off
                     logger.info(f"Starting pump {pump_id} ({ratio}%) on GPIO pin {pin} for {dur:.2f} seconds")
                     GPIO.output(pin, GPIO.HIGH)
-                    await asyncio.sleep(dur)
-                    GPIO.output(pin, GPIO.LOW)
+                    try:
+                        await asyncio.sleep(dur)
+                    finally:
+                        # Always turn the pump off, even if the pour is cancelled
+                        GPIO.output(pin, GPIO.LOW)
                     logger.info(f"Stopped pump {pump_id} on GPIO pin {pin}")
                 
                 pump_tasks.append(run_pump(gpio_pin, step.pump_id, step.ratio, duration))
         
         if pump_tasks:
+            # Configure every pin as an output (starting off) in a single call
+            pins = list(pins_to_control)
+            GPIO.setup(pins, GPIO.OUT, initial=GPIO.LOW)
+
             # Run all pumps simultaneously
             logger.info(f"Running {len(pump_tasks)} pumps simultaneously")
             await asyncio.gather(*pump_tasks)
             
             # Clean up all pins
-            for pin in pins_to_control:
-                try:
-                    GPIO.cleanup(pin)
-                except Exception:
-                    pass
+            try:
+                GPIO.cleanup(pins)
+            except Exception:
+                pass
             
             step_summary = ", ".join([f"pump {s.pump_id} ({s.ratio}%)" for s in request.steps])
             return DrinkResponse(